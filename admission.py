@@ -0,0 +1,331 @@
+"""
+Admission control for Game Tec Edition.
+Requests are classified as reads, writes or heavy administrative operations.
+Reads are always admitted; writes and heavy operations run under concurrency
+caps with short bounded queues, and heavy operations also wait while the
+scoreboard is busy with reads. Requests that cannot get a turn are turned away
+with 429 + Retry-After. In-flight counts live in a memory-mapped file shared by
+all gunicorn workers, so the caps hold across processes.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; only single-process development runs there
+    fcntl = None
+
+READ = 'read'
+WRITE = 'write'
+HEAVY = 'heavy'
+
+# Bulk imports, mass deletes and resets rewrite large parts of the data
+HEAVY_ENDPOINTS = {'bulk_register', 'bulk_delete', 'reset_data'}
+
+# POSTs that only read the data (login checks a password and sets the session cookie)
+READ_ENDPOINTS = {'teams.student_login'}
+
+DEFAULT_CONFIG = {
+    'ADMISSION_STATE_FILE': 'admission.state',  # counters shared by all workers
+    'ADMISSION_HEAVY_LIMIT': 1,        # concurrent heavy operations, across all workers
+    'ADMISSION_HEAVY_QUEUE': 0,        # heavy requests allowed to wait, across all workers
+    'ADMISSION_WRITE_LIMIT': 8,        # concurrent writes, across all workers
+    'ADMISSION_WRITE_QUEUE': 4,        # writes allowed to wait, across all workers (0 rejects at once)
+    'ADMISSION_READ_PRIORITY': 4,      # heavy operations are held back while this many reads are in flight
+    'ADMISSION_QUEUE_TIMEOUT': 2,      # seconds a queued request may wait
+    'ADMISSION_RETRY_AFTER': 5,        # seconds suggested to rejected clients
+}
+
+# A queued request re-checks its turn this often; waiting parks a worker thread,
+# so keep queues well below the thread count of the deployment
+POLL_INTERVAL = 0.02
+
+# One row of counters per worker process, after a header row holding the layout version.
+# A row belongs to a (pid, start time) pair, so a reused pid never inherits a dead worker's row
+_LAYOUT = 2
+_FIELDS = ('pid', 'started',
+           'read_active', 'read_admitted',
+           'write_active', 'write_queued', 'write_admitted', 'write_rejected',
+           'heavy_active', 'heavy_queued', 'heavy_admitted', 'heavy_rejected')
+_FIELD_INDEX = {name: i for i, name in enumerate(_FIELDS)}
+_ROW = struct.Struct(f'{len(_FIELDS)}q')
+_FIELD = struct.Struct('q')
+# In-flight counts of a dead worker must not hold slots forever
+_GAUGES = ('read_active', 'write_active', 'write_queued', 'heavy_active', 'heavy_queued')
+MAX_WORKERS = 64
+
+
+def _start_time(pid):
+    """Start time of a process in clock ticks since boot; 0 where /proc is unavailable"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return 0
+    # Fields after the parenthesized command name, which may itself contain spaces
+    return int(stat.rsplit(b')', 1)[1].split()[19])
+
+
+def _owner_alive(pid, started):
+    """Whether the process that claimed a row (pid and start time) is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return _start_time(pid) == started
+
+
+class SharedCounters:
+    """Per-worker request counters in a memory-mapped file, summed across workers"""
+
+    def __init__(self, path, slots=MAX_WORKERS):
+        self.path = path
+        self.slots = slots
+        self._file = None
+        self._map = None
+        self._pid = None
+        self._started = None
+        self._row = None
+        self._reset_thread_lock()
+        os.register_at_fork(after_in_child=self._reset_thread_lock)
+
+    def _reset_thread_lock(self):
+        self._thread_lock = threading.Lock()
+
+    def _open(self):
+        """Map the state file and claim this process's row (again after a fork)"""
+        if self._pid == os.getpid():
+            return
+        state_file = open(self.path, 'a+b')
+        size = _ROW.size * (self.slots + 1)
+        if os.fstat(state_file.fileno()).st_size < size:
+            state_file.truncate(size)
+        self._map = mmap.mmap(state_file.fileno(), size)
+        self._file = state_file
+        self._pid = os.getpid()
+        self._started = _start_time(self._pid)
+        with self._flock():
+            # A file written with another layout can't be read; start it over
+            if _FIELD.unpack_from(self._map, 0)[0] != _LAYOUT:
+                self._map[:] = bytes(size)
+                _FIELD.pack_into(self._map, 0, _LAYOUT)
+            self._row = self._claim_row()
+
+    @contextmanager
+    def _flock(self):
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def locked(self):
+        """Exclusive access to every worker's counters, for check-then-update decisions"""
+        with self._thread_lock:
+            self._open()
+            with self._flock():
+                yield
+
+    @contextmanager
+    def local(self):
+        """Access to this worker's own row only"""
+        with self._thread_lock:
+            self._open()
+            yield
+
+    def _offset(self, row, field):
+        return (row + 1) * _ROW.size + _FIELD_INDEX[field] * _FIELD.size
+
+    def _values(self, row):
+        return _ROW.unpack_from(self._map, (row + 1) * _ROW.size)
+
+    def _get(self, row, field):
+        return _FIELD.unpack_from(self._map, self._offset(row, field))[0]
+
+    def _set(self, row, field, value):
+        _FIELD.pack_into(self._map, self._offset(row, field), value)
+
+    def _clear_gauges(self, row):
+        for field in _GAUGES:
+            self._set(row, field, 0)
+
+    def _claim_row(self):
+        """Take a free row or one left by a dead worker; None if all are taken"""
+        for row in range(self.slots):
+            pid, started = self._values(row)[:2]
+            if pid == 0 or pid == self._pid or not _owner_alive(pid, started):
+                # Cumulative counters carry over; in-flight ones died with the old owner
+                self._clear_gauges(row)
+                self._set(row, 'pid', self._pid)
+                self._set(row, 'started', self._started)
+                return row
+        return None
+
+    def add(self, field, delta=1):
+        """Adjust a counter of this worker (caller holds `locked` or `local`)"""
+        if self._row is not None:
+            self._set(self._row, field, self._get(self._row, field) + delta)
+
+    def totals(self, count_workers=False):
+        """Counters summed over all workers (caller holds `locked`)
+
+        Rows of dead workers still add their cumulative counters. Liveness is only
+        checked for rows with requests in flight, unless the number of live workers
+        is asked for.
+        """
+        totals = dict.fromkeys(_FIELDS[2:], 0)
+        workers = 0
+        for row in range(self.slots):
+            values = self._values(row)
+            pid, started = values[:2]
+            if pid == 0:
+                continue
+            busy = any(values[_FIELD_INDEX[f]] for f in _GAUGES)
+            if (busy or count_workers) and row != self._row and not _owner_alive(pid, started):
+                self._clear_gauges(row)
+                values = self._values(row)
+            elif count_workers:
+                workers += 1
+            for name, value in zip(_FIELDS[2:], values[2:]):
+                totals[name] += value
+        if count_workers:
+            totals['workers'] = workers
+        return totals
+
+
+class RequestClass:
+    """Concurrency cap and queue size for one class of requests"""
+
+    def __init__(self, name, limit, queue_size):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+
+    def stats(self, totals):
+        return {
+            'active': totals[f'{self.name}_active'],
+            'queued': totals[f'{self.name}_queued'],
+            'limit': self.limit,
+            'queue_size': self.queue_size,
+            'admitted': totals[f'{self.name}_admitted'],
+            'rejected': totals[f'{self.name}_rejected'],
+        }
+
+
+class AdmissionController:
+    """Flask extension that gives reads priority and caps writes and heavy operations"""
+
+    def __init__(self, app=None):
+        self.classes = {}
+        self.counters = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULT_CONFIG.items():
+            app.config.setdefault(key, value)
+
+        self.read_priority = app.config['ADMISSION_READ_PRIORITY']
+        self.timeout = app.config['ADMISSION_QUEUE_TIMEOUT']
+        self.retry_after = app.config['ADMISSION_RETRY_AFTER']
+        self.classes = {
+            WRITE: RequestClass(WRITE, app.config['ADMISSION_WRITE_LIMIT'], app.config['ADMISSION_WRITE_QUEUE']),
+            HEAVY: RequestClass(HEAVY, app.config['ADMISSION_HEAVY_LIMIT'], app.config['ADMISSION_HEAVY_QUEUE']),
+        }
+        self.counters = SharedCounters(app.config['ADMISSION_STATE_FILE'])
+
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+
+    def classify(self, req):
+        """Classify a request as READ, WRITE or HEAVY"""
+        if req.endpoint in HEAVY_ENDPOINTS:
+            return HEAVY
+        if req.method in ('GET', 'HEAD', 'OPTIONS') or req.endpoint in READ_ENDPOINTS:
+            return READ
+        return WRITE
+
+    def stats(self):
+        """Queue depth and admission/rejection counters, summed over all workers"""
+        with self.counters.locked():
+            totals = self.counters.totals(count_workers=True)
+        result = {'workers': totals['workers'],
+                  READ: {'active': totals['read_active'], 'admitted': totals['read_admitted']}}
+        for name, cls in self.classes.items():
+            result[name] = cls.stats(totals)
+        return result
+
+    def _can_run(self, cls, totals):
+        if totals[f'{cls.name}_active'] >= cls.limit:
+            return False
+        # Only heavy operations yield to reads; single writes (awards, registrations) never starve
+        return cls.name != HEAVY or totals['read_active'] < self.read_priority
+
+    def _start(self, cls):
+        self.counters.add(f'{cls.name}_active')
+        self.counters.add(f'{cls.name}_admitted')
+
+    def _wait_turn(self, cls):
+        """Take a slot, waiting in the shared queue if it has room; False if the request must be rejected"""
+        counters = self.counters
+        with counters.locked():
+            totals = counters.totals()
+            if self._can_run(cls, totals):
+                self._start(cls)
+                return True
+            if totals[f'{cls.name}_queued'] >= cls.queue_size:
+                counters.add(f'{cls.name}_rejected')
+                return False
+            counters.add(f'{cls.name}_queued')
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            time.sleep(POLL_INTERVAL)
+            with counters.locked():
+                if self._can_run(cls, counters.totals()):
+                    counters.add(f'{cls.name}_queued', -1)
+                    self._start(cls)
+                    return True
+                if time.monotonic() >= deadline:
+                    counters.add(f'{cls.name}_queued', -1)
+                    counters.add(f'{cls.name}_rejected')
+                    return False
+
+    def _reject(self):
+        message = 'Servidor ocupado. Tente novamente em alguns segundos.'
+        return message, 429, {'Retry-After': str(self.retry_after)}
+
+    def _admit(self):
+        kind = self.classify(request)
+
+        if kind == READ:
+            with self.counters.local():
+                self.counters.add('read_active')
+                self.counters.add('read_admitted')
+            g.admission = READ
+            return None
+
+        if not self._wait_turn(self.classes[kind]):
+            return self._reject()
+        g.admission = kind
+        return None
+
+    def _release(self, exc=None):
+        kind = g.pop('admission', None)
+        if kind is None:
+            return
+
+        with self.counters.local():
+            self.counters.add(f'{kind}_active', -1)
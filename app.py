@@ -19,6 +19,10 @@ ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Admission control: reads first, capped writes and bulk operations
+from admission import AdmissionController
+admission = AdmissionController(app)
+
 # Import routes after app creation
 from routes import *
 from team_system import teams
@@ -0,0 +1,13 @@
+"""
+One-off migration: move password hashes and creation dates of existing
+students out of teams_data.json into student_credentials/<id>.json.
+Run once per data directory, before or after deploying:
+
+    python migrate_student_credentials.py
+"""
+
+from team_system import split_student_records, CREDENTIALS_DIR
+
+if __name__ == '__main__':
+    moved = split_student_records()
+    print(f"{moved} registros de alunos migrados para {CREDENTIALS_DIR}/")
@@ -1,17 +1,17 @@
 from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
 from werkzeug.utils import secure_filename
-from app import app
+from app import app, admission
 from utils import *
 from team_system import load_teams_data
+from search import STUDENT_INDEX, SEARCH_LIMIT, SEARCH_MIN_LENGTH, clamp_search_limit
 import os
 import tempfile
 
 @app.route('/')
 def index():
     """Main dashboard page"""
-    data = load_data()
     teams_data = load_teams_data()
-    return render_template('index.html', data=data, modalidades=MODALIDADES, criterios=CRITERIOS, teams_data=teams_data)
+    return render_template('index.html', modalidades=MODALIDADES, criterios=CRITERIOS, teams_data=teams_data, page_size=PAGE_SIZE, search_limit=SEARCH_LIMIT, search_min_length=SEARCH_MIN_LENGTH)
 
 @app.route('/register_student', methods=['POST'])
 def register_student():
@@ -102,6 +102,14 @@ def bulk_delete():
     modalidade = request.form.get('modalidade')
     alunos_selected = request.form.getlist('alunos_selected')
     
+    # "Select all" in the windowed list sends exclusions and the roster version it saw instead of every name
+    if request.form.get('select_all'):
+        excluded = set(request.form.getlist('alunos_excluded'))
+        expected_roster = request.form.get('expected_roster', type=int)
+        result = bulk_delete_func(modalidade, [], excluded, expected_roster)
+        flash(result['message'], result['type'])
+        return redirect(url_for('index'))
+    
     if not alunos_selected:
         flash('Nenhum aluno foi selecionado para exclusão.', 'warning')
         return redirect(url_for('index'))
@@ -129,6 +137,52 @@ def get_ranking(modalidade):
     
     return jsonify(ranking)
 
+def _page_args():
+    """Read offset/limit query parameters for paginated endpoints"""
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    return offset, limit
+
+@app.route('/api/students/<modalidade>')
+def api_students(modalidade):
+    """Paginated students list for a modality"""
+    if modalidade not in MODALIDADES:
+        return jsonify({'error': 'Modalidade inválida'}), 404
+    
+    # Read before the list, so a roster change in between makes a select-all delete refuse
+    roster = roster_version()
+    offset, limit = _page_args()
+    page = paginate(get_cached_students(modalidade), offset, limit)
+    page['roster'] = roster
+    return jsonify(page)
+
+@app.route('/api/search_students/<modalidade>')
+def api_search_students(modalidade):
+    """Typeahead search over a modality's student names"""
+    if modalidade not in MODALIDADES:
+        return jsonify({'error': 'Modalidade inválida'}), 404
+    
+    query = request.args.get('q', '')
+    limit = clamp_search_limit(request.args.get('limit', SEARCH_LIMIT, type=int))
+    matches = STUDENT_INDEX.search(modalidade, query, limit)
+    # Not paginated: the first `limit` matches, with no total count
+    return jsonify({'items': matches, 'limit': limit})
+
+@app.route('/api/ranking/<modalidade>')
+def api_ranking(modalidade):
+    """Paginated ranking for a modality or the general ranking"""
+    if modalidade != "Geral" and modalidade not in MODALIDADES:
+        return jsonify({'error': 'Modalidade inválida'}), 404
+    
+    ranking = get_cached_ranking(modalidade)['ranking']
+    offset, limit = _page_args()
+    return jsonify(paginate(ranking, offset, limit))
+
+@app.route('/api/admission_stats')
+def admission_stats():
+    """Queue depth and rejection counters of the admission control, across all workers"""
+    return jsonify(admission.stats())
+
 @app.route('/export_html/<modalidade>')
 def export_html(modalidade):
     """Export ranking to HTML file"""
@@ -0,0 +1,173 @@
+"""
+In-memory typeahead index over student names.
+Names are normalized (accents stripped, case folded) and split into tokens.
+Per modality, two sorted lists answer prefix queries with a binary search:
+(full name, name) pairs for names starting with the query, and (token, name)
+pairs for names with a word starting with each query word. Matches come out in
+the order of those lists, so a search reads only the start of each range and
+stops after `limit` matches (or SEARCH_SCAN_LIMIT entries), whatever the
+roster size.
+
+The index follows the roster version, which only registrations and deletes
+bump: point awards never re-index.
+"""
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from utils import get_cached_data, roster_version, MODALIDADES
+
+# Default and maximum number of matches returned by a search
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+# Shorter queries match too much of the roster to be useful
+SEARCH_MIN_LENGTH = 2
+
+# Word-index entries examined per search; a query whose other words rarely match
+# may return fewer than `limit` names
+SEARCH_SCAN_LIMIT = 500
+
+# Removing more names than this rebuilds the lists instead of deleting one by one
+_BULK_REMOVE = 32
+
+# Sorts after every character, bounding prefix ranges
+_MAX_CHAR = '\U0010ffff'
+
+
+def normalize(text):
+    """Lowercase text without accents ("Técnico" -> "tecnico")"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    """Normalized word tokens of a name or query"""
+    return re.findall(r'\w+', normalize(text))
+
+
+def clamp_search_limit(limit):
+    """Number of matches a search actually returns for a requested limit"""
+    return max(1, min(limit, MAX_SEARCH_LIMIT))
+
+
+def _prefix_range(entries, prefix):
+    """Slice bounds of the sorted (key, name) entries whose key starts with prefix"""
+    return (bisect_left(entries, (prefix, '')),
+            bisect_left(entries, (prefix + _MAX_CHAR, '')))
+
+
+class _ModalityIndex:
+    """Prefix index for the students of one modality"""
+
+    def __init__(self):
+        self.full = []      # sorted (normalized full name, name) pairs
+        self.entries = []   # sorted (token, name) pairs
+        self.names = {}     # name -> normalized full name
+
+    def add(self, names):
+        """Index new names; one sort per call, which is linear for a few appended names"""
+        for name in names:
+            if name in self.names:
+                continue
+            tokens = tokenize(name)
+            normalized = ' '.join(tokens)
+            self.names[name] = normalized
+            self.full.append((normalized, name))
+            self.entries.extend((token, name) for token in set(tokens))
+        self.full.sort()
+        self.entries.sort()
+
+    def remove(self, names):
+        names = [name for name in names if name in self.names]
+        if len(names) > _BULK_REMOVE:
+            gone = set(names)
+            for name in gone:
+                del self.names[name]
+            self.full = [pair for pair in self.full if pair[1] not in gone]
+            self.entries = [pair for pair in self.entries if pair[1] not in gone]
+            return
+
+        for name in names:
+            normalized = self.names.pop(name)
+            for entries, key in [(self.full, normalized)] + [(self.entries, token) for token in set(normalized.split())]:
+                i = bisect_left(entries, (key, name))
+                if i < len(entries) and entries[i] == (key, name):
+                    del entries[i]
+
+    def scan(self, entries, prefix, count):
+        """Names of the first `count` entries whose key starts with prefix, in index order"""
+        start, end = _prefix_range(entries, prefix)
+        return [name for _, name in entries[start:min(end, start + count)]]
+
+    def prefix_count(self, prefix):
+        """Number of entries whose token starts with prefix"""
+        start, end = _prefix_range(self.entries, prefix)
+        return end - start
+
+
+class StudentSearchIndex:
+    """Accent- and case-insensitive prefix search over student names, per modality"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._roster = None
+        self._indexes = {mod: _ModalityIndex() for mod in MODALIDADES}
+
+    def _sync(self):
+        """Bring the index up to date with the registered students, touching only changed names"""
+        roster = roster_version()
+        if roster == self._roster:
+            return
+
+        data = get_cached_data()
+        for mod in MODALIDADES:
+            index = self._indexes[mod]
+            current = data.get(mod, {})
+            index.remove([name for name in index.names if name not in current])
+            index.add([name for name in current if name not in index.names])
+        self._roster = roster
+
+    def search(self, modalidade, query, limit=SEARCH_LIMIT):
+        """Matches for query as [{"nome", "pontos"}]
+
+        Names starting with the query come first, alphabetically (accents and case
+        ignored); then names with a word starting with each query word, ordered by
+        the matched word of the least common query word, then by name.
+        """
+        tokens = tokenize(query)
+        normalized_query = ' '.join(tokens)
+        if modalidade not in self._indexes or len(normalized_query) < SEARCH_MIN_LENGTH:
+            return []
+        limit = clamp_search_limit(limit)
+
+        with self._lock:
+            self._sync()
+            index = self._indexes[modalidade]
+            names = index.names
+
+            matches = index.scan(index.full, normalized_query, limit)
+
+            # Fewer than `limit` names start with the query, so `matches` holds all of them
+            if len(matches) < limit:
+                seen = set(matches)
+                rarest = min(tokens, key=index.prefix_count)
+                word_starts = [' ' + q for q in tokens]
+                for name in index.scan(index.entries, rarest, SEARCH_SCAN_LIMIT):
+                    if name in seen:
+                        continue
+                    seen.add(name)
+                    padded = ' ' + names[name]
+                    if all(w in padded for w in word_starts):
+                        matches.append(name)
+                        if len(matches) == limit:
+                            break
+
+        points = get_cached_data().get(modalidade, {})
+        return [{"nome": name, "pontos": points.get(name, 0)} for name in matches]
+
+
+# Shared by all requests of this worker
+STUDENT_INDEX = StudentSearchIndex()
@@ -178,12 +178,16 @@ function validateForm(form) {
     const requiredInputs = form.querySelectorAll('input[required], select[required]');
     
     requiredInputs.forEach(input => {
+        // Hidden inputs (student pickers) show their state on the visible selection box
+        const feedback = input.type === 'hidden'
+            ? input.parentNode.querySelector('.student-picker-selected') || input
+            : input;
         if (!input.value.trim()) {
-            input.classList.add('input-error');
+            feedback.classList.add('input-error');
             isValid = false;
         } else {
-            input.classList.remove('input-error');
-            input.classList.add('input-success');
+            feedback.classList.remove('input-error');
+            feedback.classList.add('input-success');
         }
     });
     
@@ -194,8 +198,8 @@ function validateForm(form) {
 function deleteStudent(modalidade) {
     const tabPane = document.querySelector(`#${modalidade.replace(' ', '_')}-pane`);
     const form = tabPane.querySelector('form[action*="add_points"]');
-    const selectElement = form.querySelector('select[name="aluno"]');
-    const aluno = selectElement.value;
+    const alunoInput = form.querySelector('[name="aluno"]');
+    const aluno = alunoInput.value;
     
     if (!aluno) {
         showAlert('Selecione um aluno para excluir.', 'warning');
@@ -264,6 +268,149 @@ function updateStudentSelect(selectElement, modalidade) {
     }
 }
 
+// Escape text before interpolating it into HTML templates
+function escapeHtml(text) {
+    return String(text == null ? '' : text)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+// Windowed list backed by a paginated JSON endpoint ({items, total, offset, limit}),
+// or by a single response of {items} such as search results.
+// Only the rows inside the scroll viewport (plus a small overscan) exist in the DOM,
+// and pages are fetched on demand as the user scrolls.
+class VirtualList {
+    constructor(viewport, options) {
+        this.viewport = viewport;
+        this.url = options.url;
+        this.renderRow = options.renderRow;
+        this.renderEmpty = options.renderEmpty || (() => '');
+        this.onLoad = options.onLoad || (() => {});
+        this.rowHeight = options.rowHeight || 48;
+        this.pageSize = options.pageSize || 50;
+        this.height = options.height || 480;
+        this.overscan = options.overscan || 6;
+        
+        this.spacer = viewport.querySelector('.virtual-spacer');
+        this.window = viewport.querySelector('.virtual-window');
+        this.body = viewport.querySelector('[data-virtual-body]') || this.window;
+        
+        this.pages = new Map();
+        this.pending = new Set();
+        this.total = null;
+        this.generation = 0;
+        this.frame = null;
+        this.lastRange = '';
+        
+        viewport.addEventListener('scroll', () => this.scheduleRender(), { passive: true });
+        this.fetchPage(0);
+    }
+    
+    setUrl(url) {
+        this.url = url;
+        this.viewport.scrollTop = 0;
+        this.reload();
+    }
+    
+    reload() {
+        this.generation++;
+        this.pages.clear();
+        this.pending.clear();
+        this.lastRange = '';
+        this.fetchPage(0);
+    }
+    
+    fetchPage(page) {
+        if (this.pages.has(page) || this.pending.has(page)) {
+            return;
+        }
+        
+        const generation = this.generation;
+        const separator = this.url.includes('?') ? '&' : '?';
+        const url = `${this.url}${separator}offset=${page * this.pageSize}&limit=${this.pageSize}`;
+        
+        this.pending.add(page);
+        fetch(url)
+            .then(response => response.json())
+            .then(result => {
+                if (generation !== this.generation) {
+                    return;
+                }
+                this.pending.delete(page);
+                this.pages.set(page, result.items);
+                // Responses without a total (search results) are complete in themselves
+                this.total = 'total' in result ? result.total : result.items.length;
+                this.lastRange = '';
+                this.onLoad(this, result);
+                this.scheduleRender();
+            })
+            .catch(error => {
+                this.pending.delete(page);
+                console.error('Error loading list page:', error);
+            });
+    }
+    
+    getItem(index) {
+        const page = this.pages.get(Math.floor(index / this.pageSize));
+        return page ? page[index % this.pageSize] : undefined;
+    }
+    
+    scheduleRender() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => {
+                this.frame = null;
+                this.render();
+            });
+        }
+    }
+    
+    render() {
+        if (this.total === null) {
+            return;
+        }
+        
+        this.spacer.style.height = `${this.total * this.rowHeight}px`;
+        
+        if (this.total === 0) {
+            this.window.style.transform = 'translateY(0)';
+            this.body.innerHTML = this.renderEmpty();
+            this.lastRange = 'empty';
+            return;
+        }
+        
+        // Hidden tab panes report zero height, so fall back to the configured height
+        const viewportHeight = this.viewport.clientHeight || this.height;
+        let start = Math.max(0, Math.floor(this.viewport.scrollTop / this.rowHeight) - this.overscan);
+        start -= start % 2;  // Keep striping stable while scrolling
+        const end = Math.min(this.total, Math.ceil((this.viewport.scrollTop + viewportHeight) / this.rowHeight) + this.overscan);
+        
+        const range = `${start}:${end}`;
+        if (range === this.lastRange) {
+            return;
+        }
+        this.lastRange = range;
+        
+        for (let page = Math.floor(start / this.pageSize); page <= Math.floor((end - 1) / this.pageSize); page++) {
+            this.fetchPage(page);
+        }
+        
+        const rows = [];
+        for (let index = start; index < end; index++) {
+            rows.push(this.renderRow(this.getItem(index), index));
+        }
+        this.window.style.transform = `translateY(${start * this.rowHeight}px)`;
+        this.body.innerHTML = rows.join('');
+    }
+    
+    refresh() {
+        this.lastRange = '';
+        this.render();
+    }
+}
+
 // Show custom alerts
 function showAlert(message, type = 'info') {
     const alertDiv = document.createElement('div');
@@ -0,0 +1,268 @@
+"""
+JSON file storage shared by the ranking and team systems.
+Safe to use from several gunicorn workers: writes are atomic and serialized
+with an inter-process lock, and a generation counter in shared memory tells
+every worker when its cached views are stale. GroupCommitter batches bursts of
+small writes into a single durable commit, and KeyedJsonStore keeps rarely read
+records out of the hot documents.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; only single-process development runs there
+    fcntl = None
+
+# Layout of the sidecar lock file: unsigned 64-bit generation and roster counters
+_GENERATION = struct.Struct('Q')
+_ROSTER_OFFSET = _GENERATION.size
+_SIDECAR_SIZE = 2 * _GENERATION.size
+
+
+class Rollback(Exception):
+    """Raise inside a transaction to end it without writing; `result` is returned to group-commit submitters"""
+
+    def __init__(self, result=None):
+        super().__init__(result)
+        self.result = result
+
+
+def atomic_write_json(path, data, indent=4):
+    """Write to a temporary file, fsync it and atomically replace `path`"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonStore:
+    """A JSON document on disk with atomic writes and cross-process generation counters"""
+
+    def __init__(self, path, default_factory, indent=4):
+        self.path = path
+        self.default_factory = default_factory
+        self.indent = indent
+        self.lock_path = f"{path}.lock"
+        self._lock_file = None
+        self._generation = None
+        self._pid = None
+        self._roster_changed = False
+        self._reset_thread_lock()
+        os.register_at_fork(after_in_child=self._reset_thread_lock)
+
+    def _reset_thread_lock(self):
+        # flock does not exclude threads sharing a descriptor, so they queue on this first
+        self._thread_lock = threading.RLock()
+
+    def _open_lock_file(self):
+        """Open (and map) the sidecar file used for locking and the generation counters"""
+        # flock belongs to the open file description, which a forked worker shares
+        # with its parent, so every process needs its own descriptor
+        if self._pid != os.getpid():
+            lock_file = open(self.lock_path, 'a+b')
+            if os.fstat(lock_file.fileno()).st_size < _SIDECAR_SIZE:
+                lock_file.truncate(_SIDECAR_SIZE)
+            self._generation = mmap.mmap(lock_file.fileno(), _SIDECAR_SIZE)
+            self._lock_file = lock_file
+            self._pid = os.getpid()
+        return self._lock_file
+
+    def version(self):
+        """Generation counter, bumped by every process on every write"""
+        self._open_lock_file()
+        return _GENERATION.unpack_from(self._generation)[0]
+
+    def roster_version(self):
+        """Counter bumped only by writes marked with mark_roster_changed (and by save)"""
+        self._open_lock_file()
+        return _GENERATION.unpack_from(self._generation, _ROSTER_OFFSET)[0]
+
+    def mark_roster_changed(self):
+        """Inside a transaction: its write also changes which records exist, not just their values"""
+        self._roster_changed = True
+
+    @contextmanager
+    def _locked(self):
+        """Hold the exclusive lock for this store, across threads and processes"""
+        with self._thread_lock:
+            lock_file = self._open_lock_file()
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def load(self):
+        """Read the document; writes replace the file atomically, so no lock is needed"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return self.default_factory()
+
+    def _write(self, data):
+        """Atomically replace the document and bump the generation (and, if marked, roster) counters"""
+        atomic_write_json(self.path, data, self.indent)
+
+        if self._roster_changed:
+            roster = _GENERATION.unpack_from(self._generation, _ROSTER_OFFSET)[0]
+            _GENERATION.pack_into(self._generation, _ROSTER_OFFSET, roster + 1)
+            self._roster_changed = False
+        generation = _GENERATION.unpack_from(self._generation)[0]
+        _GENERATION.pack_into(self._generation, 0, generation + 1)
+
+    def save(self, data):
+        """Replace the whole document"""
+        with self._locked():
+            self._roster_changed = True
+            self._write(data)
+
+    @contextmanager
+    def transaction(self):
+        """Exclusive read-modify-write: yields the current document and saves it unless the block raises
+
+        Raising Rollback ends the transaction quietly without writing, so paths that
+        change nothing don't rewrite the file or invalidate every worker's caches.
+        """
+        with self._locked():
+            data = self.load()
+            self._roster_changed = False
+            try:
+                yield data
+            except Rollback:
+                return
+            self._write(data)
+
+
+class KeyedJsonStore:
+    """A directory of small JSON documents, read and written one key at a time"""
+
+    def __init__(self, directory, indent=2):
+        self.directory = directory
+        self.indent = indent
+
+    def _path(self, key):
+        key = str(key)
+        if not key.isalnum():
+            raise ValueError(f"Invalid store key: {key!r}")
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Document stored under key, or None"""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, data):
+        """Atomically store the document under key"""
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write_json(self._path(key), data, self.indent)
+
+
+class _PendingMutation:
+    """A queued mutation and the outcome its submitter is waiting for"""
+
+    def __init__(self, mutation):
+        self.mutation = mutation
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GroupCommitter:
+    """Write-behind scheduler: mutations submitted within `window` seconds share one store transaction"""
+
+    def __init__(self, store, window):
+        self.store = store
+        self.window = window
+        self._reset()
+        # A forked worker inherits neither the commit thread nor a usable queue
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        self._pending = []
+        self._thread = None
+
+    def submit(self, mutation):
+        """Queue mutation(data) and block until its group is persisted; returns the mutation's result"""
+        entry = _PendingMutation(mutation)
+        if self.window <= 0:
+            self._commit([entry])
+            return self._outcome(entry)
+
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                self._thread.start()
+            self._pending.append(entry)
+            self._cond.notify()
+
+        entry.done.wait()
+        return self._outcome(entry)
+
+    def _outcome(self, entry):
+        if entry.error is not None:
+            raise entry.error
+        return entry.result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+            # Let the rest of the burst arrive before committing
+            time.sleep(self.window)
+
+            with self._cond:
+                batch, self._pending = self._pending, []
+            self._commit(batch)
+
+    def _commit(self, batch):
+        """Apply a group of mutations in submission order and persist them with one write
+
+        A mutation raises Rollback(result) when it changes nothing; if none of the
+        group changed anything, nothing is written.
+        """
+        try:
+            with self.store.transaction() as data:
+                dirty = False
+                for entry in batch:
+                    try:
+                        entry.result = entry.mutation(data)
+                        dirty = True
+                    except Rollback as e:
+                        entry.result = e.result
+                    except Exception as e:
+                        entry.error = e
+                if not dirty:
+                    raise Rollback
+        except Exception as e:
+            for entry in batch:
+                entry.error = e
+        finally:
+            for entry in batch:
+                entry.done.set()
@@ -3,13 +3,14 @@ New team-based system for Game Tec Edition
 This will integrate with the existing JSON-based system while adding PostgreSQL support
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
-from utils import load_data, save_data, MODALIDADES
+from utils import load_data, data_transaction, data_version, roster_changed, get_cached_ranking, MODALIDADES
+from storage import JsonStore, KeyedJsonStore, Rollback
+from contextlib import contextmanager
 import json
 import string
 import random
-import os
 
 # Team system blueprint
 teams = Blueprint('teams', __name__, url_prefix='/teams')
@@ -17,62 +18,253 @@ teams = Blueprint('teams', __name__, url_prefix='/teams')
 # File-based storage for team data (extending the current system)
 TEAMS_FILE = 'teams_data.json'
 
+# Number of students shown in the dashboard ranking preview
+DASHBOARD_TOP_N = 10
+
+# Teams store, shared safely between worker processes
+TEAMS_STORE = JsonStore(TEAMS_FILE, lambda: {'teams': {}, 'students': {}, 'next_id': 1}, indent=2)
+
+# Per-student dashboard view models keyed by student ID
+_student_view_cache = {}
+
+# Credentials and rarely used student fields live outside the hot teams file,
+# one small document per student, so read paths never parse password hashes
+CREDENTIALS_DIR = 'student_credentials'
+CREDENTIALS_STORE = KeyedJsonStore(CREDENTIALS_DIR)
+COLD_STUDENT_FIELDS = ('password_hash', 'created_at')
+
 def load_teams_data():
     """Load teams data from JSON file"""
     try:
-        if os.path.exists(TEAMS_FILE):
-            with open(TEAMS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {'teams': {}, 'students': {}, 'next_id': 1}
+        return TEAMS_STORE.load()
     except:
         return {'teams': {}, 'students': {}, 'next_id': 1}
 
-def save_teams_data(data):
-    """Save teams data to JSON file and integrate with main system"""
+@contextmanager
+def teams_transaction():
+    """Locked load -> mutate -> save of the teams data, integrated with the main system afterwards"""
+    with TEAMS_STORE.transaction() as data:
+        yield data
+    
+    # Outside the teams lock, so the two files are never locked at once. The teams
+    # change is already committed, so a failure here is logged rather than reported
+    # as the caller's; the next teams write picks up the missing students again.
     try:
-        with open(TEAMS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        # Integrate teams with main system
         integrate_teams_with_main_system(data)
-        return True
-    except:
-        return False
+    except Exception:
+        current_app.logger.exception('Falha ao integrar equipes ao ranking')
 
-def integrate_teams_with_main_system(teams_data):
-    """Integrate team students with the main ranking system"""
-    main_data = load_data()
+def load_student_cold(student):
+    """Cold fields (password hash, creation date) of a student, loaded by key"""
+    cold = CREDENTIALS_STORE.get(student['id']) or {}
+    # Records written before the split still carry their cold fields inline
+    for field in COLD_STUDENT_FIELDS:
+        if field in student:
+            cold.setdefault(field, student[field])
+    return cold
+
+def split_student_records():
+    """Move cold fields of legacy student records out of the teams file; returns how many moved
     
-    # Add team students to the main ranking system
+    A one-off migration, run with `python migrate_student_credentials.py`. Until then,
+    legacy records keep working through the inline fallback in load_student_cold.
+    """
+    moved = 0
+    with TEAMS_STORE.transaction() as teams_data:
+        for student_id, student in teams_data['students'].items():
+            if not any(field in student for field in COLD_STUDENT_FIELDS):
+                continue
+            # Persist the cold record before dropping the fields from the hot one
+            CREDENTIALS_STORE.put(student_id, load_student_cold(student))
+            for field in COLD_STUDENT_FIELDS:
+                student.pop(field, None)
+            moved += 1
+        if not moved:
+            raise Rollback
+    return moved
+
+def _missing_team_students(teams_data, main_data):
+    """(modalidade, name) pairs of team members not yet in the main ranking"""
+    missing = []
     for team_id, team in teams_data['teams'].items():
         modalidade = team['modalidade']
-        
-        # Ensure modalidade exists in main data
-        if modalidade not in main_data:
-            main_data[modalidade] = {}
-        
-        # Add each team member to the main system if not already there
         for member_id in team['members']:
             member = teams_data['students'].get(member_id)
-            if member:
-                student_name = member['name']
-                # Add student to main ranking system if not exists
-                if student_name not in main_data[modalidade]:
-                    main_data[modalidade][student_name] = 0
-    
-    # Save updated main data
-    save_data(main_data)
+            if member and member['name'] not in main_data.get(modalidade, {}):
+                missing.append((modalidade, member['name']))
+    return missing
+
+def integrate_teams_with_main_system(teams_data):
+    """Integrate team students with the main ranking system"""
+    # Cheap unlocked check first, so saves that add nobody don't rewrite the ranking file
+    if not _missing_team_students(teams_data, load_data()):
+        return
+    
+    with data_transaction() as main_data:
+        missing = _missing_team_students(teams_data, main_data)
+        if not missing:
+            raise Rollback  # another worker added them meanwhile
+        for modalidade, student_name in missing:
+            main_data.setdefault(modalidade, {})[student_name] = 0
+        roster_changed()
+
+def build_student_view(teams_data, student_id):
+    """Build the dashboard view model for one student (no credentials, no other teams)"""
+    student = teams_data['students'].get(student_id)
+    if not student:
+        return None
+    
+    view = {
+        'student': {
+            'id': student['id'],
+            'name': student['name'],
+            'email': student['email'],
+            'team_id': student['team_id'],
+            'is_active': student['is_active'],
+        },
+        'team': None,
+        'points': 0,
+        'rank': None,
+        'top': [],
+    }
+    
+    team = teams_data['teams'].get(student['team_id']) if student['team_id'] else None
+    if not team:
+        return view
+    
+    modalidade = team['modalidade']
+    ranking = get_cached_ranking(modalidade)
+    points = ranking['points']
+    
+    members = []
+    for member_id in team['members']:
+        member = teams_data['students'].get(member_id)
+        if member:
+            members.append({
+                'name': member['name'],
+                'points': points.get(member['name'], 0),
+                'is_captain': member_id == team['captain_id'],
+                'is_current': member_id == student_id
+            })
+    members.sort(key=lambda x: x['points'], reverse=True)
+    
+    view['team'] = {
+        'id': team['id'],
+        'name': team['name'],
+        'description': team.get('description', ''),
+        'modalidade': modalidade,
+        'captain_id': team['captain_id'],
+        'access_code': team['access_code'],
+        'members': members,
+    }
+    view['points'] = points.get(student['name'], 0)
+    view['rank'] = ranking['positions'].get(student['name'])
+    view['top'] = ranking['ranking'][:DASHBOARD_TOP_N]
+    return view
+
+def get_student_view(student_id):
+    """Get a student's dashboard view model, rebuilt only after teams or points change"""
+    version = (TEAMS_STORE.version(), data_version())
+    cached = _student_view_cache.get(student_id)
+    if cached and cached[0] == version:
+        return cached[1]
+    
+    view = build_student_view(load_teams_data(), student_id)
+    if view is not None:
+        _student_view_cache[student_id] = (version, view)
+    else:
+        _student_view_cache.pop(student_id, None)
+    return view
 
 def generate_access_code():
     """Generate a random 8-character access code"""
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
 
+class RegistrationError(Exception):
+    """Validation failure inside a registration transaction; nothing is saved"""
+
+def _register_student(teams_data, name, email, password_hash, team_action, form):
+    """Add a student (and create or join a team) to teams_data, returning the new student ID"""
+    # Check if email already exists
+    if any(student['email'] == email for student in teams_data['students'].values()):
+        raise RegistrationError('Este email já está cadastrado.')
+    
+    # Create student ID
+    student_id = str(teams_data['next_id'])
+    teams_data['next_id'] += 1
+    
+    # Create student data
+    student_data = {
+        'id': student_id,
+        'name': name,
+        'email': email,
+        'team_id': None,
+        'total_points': 0,
+        'is_active': True,
+    }
+    
+    # Handle team creation or joining
+    team_id = None
+    if team_action == 'create':
+        team_name = form.get('team_name', '').strip()
+        modalidade = form.get('modalidade')
+        description = form.get('description', '').strip()
+        
+        if not team_name or not modalidade:
+            raise RegistrationError('Nome da equipe e modalidade são obrigatórios.')
+        
+        # Check if team name already exists
+        if any(team['name'] == team_name for team in teams_data['teams'].values()):
+            raise RegistrationError('Já existe uma equipe com este nome.')
+        
+        # Create team
+        team_id = str(len(teams_data['teams']) + 1)
+        teams_data['teams'][team_id] = {
+            'id': team_id,
+            'name': team_name,
+            'description': description,
+            'modalidade': modalidade,
+            'captain_id': student_id,
+            'access_code': generate_access_code(),
+            'members': [student_id],
+            'created_at': str(json.dumps({}))
+        }
+        
+    elif team_action == 'join':
+        access_code = form.get('access_code', '').strip().upper()
+        
+        if not access_code:
+            raise RegistrationError('Código de acesso é obrigatório.')
+        
+        # Find team by access code
+        found_team = None
+        for tid, team in teams_data['teams'].items():
+            if team['access_code'] == access_code:
+                found_team = team
+                team_id = tid
+                break
+        
+        if not found_team:
+            raise RegistrationError('Código de acesso inválido.')
+        
+        # Add student to team
+        teams_data['teams'][team_id]['members'].append(student_id)
+    
+    # Set team_id for student
+    student_data['team_id'] = team_id
+    teams_data['students'][student_id] = student_data
+    
+    # Written before the teams file commits, so no profile exists without credentials
+    CREDENTIALS_STORE.put(student_id, {
+        'password_hash': password_hash,
+        'created_at': str(json.dumps({})),  # Current timestamp placeholder
+    })
+    return student_id
+
 @teams.route('/student/register', methods=['GET', 'POST'])
 def student_register():
     """Student registration page"""
     if request.method == 'POST':
-        teams_data = load_teams_data()
-        
         name = request.form.get('name', '').strip()
         email = request.form.get('email', '').strip().lower()
         password = request.form.get('password', '')
@@ -83,91 +275,25 @@ def student_register():
             flash('Todos os campos são obrigatórios.', 'error')
             return render_template('teams/student_register.html', modalidades=MODALIDADES)
         
-        # Check if email already exists
-        if any(student['email'] == email for student in teams_data['students'].values()):
-            flash('Este email já está cadastrado.', 'error')
-            return render_template('teams/student_register.html', modalidades=MODALIDADES)
-        
-        # Create student ID
-        student_id = str(teams_data['next_id'])
-        teams_data['next_id'] += 1
-        
-        # Create student data
-        student_data = {
-            'id': student_id,
-            'name': name,
-            'email': email,
-            'password_hash': generate_password_hash(password),
-            'team_id': None,
-            'total_points': 0,
-            'is_active': True,
-            'created_at': str(json.dumps({})),  # Current timestamp placeholder
-        }
-        
-        # Handle team creation or joining
-        team_id = None
-        if team_action == 'create':
-            team_name = request.form.get('team_name', '').strip()
-            modalidade = request.form.get('modalidade')
-            description = request.form.get('description', '').strip()
-            
-            if not team_name or not modalidade:
-                flash('Nome da equipe e modalidade são obrigatórios.', 'error')
-                return render_template('teams/student_register.html', modalidades=MODALIDADES)
-            
-            # Check if team name already exists
-            if any(team['name'] == team_name for team in teams_data['teams'].values()):
-                flash('Já existe uma equipe com este nome.', 'error')
-                return render_template('teams/student_register.html', modalidades=MODALIDADES)
-            
-            # Create team
-            team_id = str(len(teams_data['teams']) + 1)
-            teams_data['teams'][team_id] = {
-                'id': team_id,
-                'name': team_name,
-                'description': description,
-                'modalidade': modalidade,
-                'captain_id': student_id,
-                'access_code': generate_access_code(),
-                'members': [student_id],
-                'created_at': str(json.dumps({}))
-            }
-            
-        elif team_action == 'join':
-            access_code = request.form.get('access_code', '').strip().upper()
-            
-            if not access_code:
-                flash('Código de acesso é obrigatório.', 'error')
-                return render_template('teams/student_register.html', modalidades=MODALIDADES)
-            
-            # Find team by access code
-            found_team = None
-            for tid, team in teams_data['teams'].items():
-                if team['access_code'] == access_code:
-                    found_team = team
-                    team_id = tid
-                    break
-            
-            if not found_team:
-                flash('Código de acesso inválido.', 'error')
-                return render_template('teams/student_register.html', modalidades=MODALIDADES)
-            
-            # Add student to team
-            teams_data['teams'][team_id]['members'].append(student_id)
-        
-        # Set team_id for student
-        student_data['team_id'] = team_id
-        teams_data['students'][student_id] = student_data
+        # Hash before taking the lock; scrypt is deliberately slow
+        password_hash = generate_password_hash(password)
         
         # Save data and integrate with main system
-        if save_teams_data(teams_data):
-            flash('Cadastro realizado com sucesso! Seu perfil foi automaticamente adicionado ao sistema de ranking.', 'success')
-            # Store student session
-            session['student_id'] = student_id
-            session['is_student'] = True
-            return redirect(url_for('teams.student_dashboard'))
-        else:
+        try:
+            with teams_transaction() as teams_data:
+                student_id = _register_student(teams_data, name, email, password_hash, team_action, request.form)
+        except RegistrationError as e:
+            flash(str(e), 'error')
+            return render_template('teams/student_register.html', modalidades=MODALIDADES)
+        except Exception:
             flash('Erro ao cadastrar. Tente novamente.', 'error')
+            return render_template('teams/student_register.html', modalidades=MODALIDADES)
+        
+        flash('Cadastro realizado com sucesso! Seu perfil foi automaticamente adicionado ao sistema de ranking.', 'success')
+        # Store student session
+        session['student_id'] = student_id
+        session['is_student'] = True
+        return redirect(url_for('teams.student_dashboard'))
     
     return render_template('teams/student_register.html', modalidades=MODALIDADES)
 
@@ -191,7 +317,9 @@ def student_login():
                 student = student_data
                 break
         
-        if student and check_password_hash(student['password_hash'], password):
+        password_hash = load_student_cold(student).get('password_hash') if student else None
+        
+        if password_hash and check_password_hash(password_hash, password):
             if not student['is_active']:
                 flash('Sua conta está desativada.', 'error')
                 return render_template('teams/student_login.html')
@@ -213,28 +341,31 @@ def student_dashboard():
         flash('Por favor, faça login como aluno.', 'error')
         return redirect(url_for('teams.student_login'))
     
-    teams_data = load_teams_data()
-    student_id = session.get('student_id')
-    student = teams_data['students'].get(student_id)
+    view = get_student_view(session.get('student_id'))
     
-    if not student:
+    if not view:
         flash('Aluno não encontrado.', 'error')
         session.clear()
         return redirect(url_for('teams.student_login'))
     
-    # Get team data
-    team = None
-    if student['team_id']:
-        team = teams_data['teams'].get(student['team_id'])
+    return render_template('teams/student_dashboard.html', 
+                         student=view['student'], 
+                         team=view['team'], 
+                         points=view['points'],
+                         rank=view['rank'],
+                         top=view['top'])
+
+@teams.route('/api/student_dashboard')
+def api_student_dashboard():
+    """API endpoint with the logged-in student's dashboard view model"""
+    if not session.get('is_student'):
+        return jsonify({'error': 'Not logged in'}), 401
     
-    # Get ranking data from existing system
-    ranking_data = load_data()
+    view = get_student_view(session.get('student_id'))
+    if not view:
+        return jsonify({'error': 'Student not found'}), 404
     
-    return render_template('teams/student_dashboard.html', 
-                         student=student, 
-                         team=team, 
-                         teams_data=teams_data,
-                         ranking_data=ranking_data)
+    return jsonify(view)
 
 @teams.route('/student/logout')
 def student_logout():
@@ -269,7 +400,7 @@ def manage_team():
     for member_id in team['members']:
         member = teams_data['students'].get(member_id)
         if member:
-            members.append(member)
+            members.append(dict(member, created_at=load_student_cold(member).get('created_at')))
     
     return render_template('teams/manage_team.html', 
                          student=student, 
@@ -1,8 +1,8 @@
-import json
 import os
 import pandas as pd
 import tempfile
 from datetime import datetime
+from storage import JsonStore, GroupCommitter, Rollback
 
 # Data file
 ARQUIVO_DADOS = "game_tec_data.json"
@@ -29,20 +29,60 @@ CRITERIOS = {
 # Modalities
 MODALIDADES = ["Aprendizagem", "Técnico", "Técnico NEM"]
 
+# Pagination limits for the JSON list endpoints
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Ranking data store, shared safely between worker processes
+DATA_STORE = JsonStore(ARQUIVO_DADOS, lambda: {mod: {} for mod in MODALIDADES}, indent=4)
+
+# Point awards and registrations arriving within this window share one disk write (0 disables).
+# Only worth enabling with threaded workers (gunicorn --threads N): a sync worker serves one
+# request at a time, so there is never a burst to batch and every award would just wait out
+# the window. Mutations are applied at commit time to the freshly loaded, locked document
+# rather than to an in-memory copy right away, so other workers never see unsaved state.
+GROUP_COMMIT_WINDOW = int(os.environ.get("GROUP_COMMIT_WINDOW_MS", "0")) / 1000
+DATA_COMMITTER = GroupCommitter(DATA_STORE, GROUP_COMMIT_WINDOW)
+
+# Parsed data, modality rankings and student lists, rebuilt when the data version changes
+_data_cache = {}
+_ranking_cache = {}
+_students_cache = {}
+
+def data_version():
+    """Current version of the ranking data (shared across worker processes)"""
+    return DATA_STORE.version()
+
+def roster_version():
+    """Version of the set of registered students; point changes leave it alone"""
+    return DATA_STORE.roster_version()
+
+def roster_changed():
+    """Inside a data transaction: it adds or removes students"""
+    DATA_STORE.mark_roster_changed()
+
 def load_data():
     """Load data from JSON file"""
-    if os.path.exists(ARQUIVO_DADOS):
-        try:
-            with open(ARQUIVO_DADOS, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {mod: {} for mod in MODALIDADES}
-    return {mod: {} for mod in MODALIDADES}
+    return DATA_STORE.load()
+
+def get_cached_data():
+    """Parsed ranking data, shared per data version; callers must not modify it"""
+    version = data_version()
+    cached = _data_cache.get('data')
+    if cached and cached[0] == version:
+        return cached[1]
+    
+    data = load_data()
+    _data_cache['data'] = (version, data)
+    return data
 
 def save_data(data):
     """Save data to JSON file"""
-    with open(ARQUIVO_DADOS, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    DATA_STORE.save(data)
+
+def data_transaction():
+    """Locked load -> mutate -> save of the ranking data (use as a context manager)"""
+    return DATA_STORE.transaction()
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -50,33 +90,35 @@ def allowed_file(filename):
 
 def register_student_func(modalidade, nome):
     """Register a single student"""
-    data = load_data()
-    
-    if nome in data[modalidade]:
-        return {"message": f"{nome} já está cadastrado.", "type": "info"}
-    else:
+    def register(data):
+        if nome in data[modalidade]:
+            raise Rollback({"message": f"{nome} já está cadastrado.", "type": "info"})
         data[modalidade][nome] = 0
-        save_data(data)
+        roster_changed()
         return {"message": f"Aluno {nome} cadastrado com sucesso!", "type": "success"}
+    
+    return DATA_COMMITTER.submit(register)
 
 def bulk_register_func(modalidade, filepath):
     """Register students in bulk from file"""
     try:
-        data = load_data()
-        
+        # Parse the file before taking the lock
         if filepath.endswith(".csv"):
             df = pd.read_csv(filepath)
         else:
             df = pd.read_excel(filepath)
         
         registered_count = 0
-        for nome in df.iloc[:,0].dropna():
-            nome = str(nome).strip()
-            if nome and nome not in data[modalidade]:
-                data[modalidade][nome] = 0
-                registered_count += 1
+        with data_transaction() as data:
+            for nome in df.iloc[:,0].dropna():
+                nome = str(nome).strip()
+                if nome and nome not in data[modalidade]:
+                    data[modalidade][nome] = 0
+                    registered_count += 1
+            if not registered_count:
+                raise Rollback
+            roster_changed()
         
-        save_data(data)
         return {"message": f"Cadastro em massa concluído! {registered_count} alunos registrados.", "type": "success"}
         
     except Exception as e:
@@ -87,11 +129,6 @@ def add_points_func(modalidade, aluno, criterios, variable_points=None):
     if variable_points is None:
         variable_points = {}
         
-    data = load_data()
-    
-    if not aluno or aluno not in data[modalidade]:
-        return {"message": "Selecione um aluno válido.", "type": "warning"}
-    
     total_pontos = 0
     for crit in criterios:
         if crit in CRITERIOS:
@@ -100,20 +137,24 @@ def add_points_func(modalidade, aluno, criterios, variable_points=None):
                 pontos = variable_points.get(crit, 0)
             total_pontos += pontos
     
-    data[modalidade][aluno] += total_pontos
-    save_data(data)
-    return {"message": f"{total_pontos} pontos adicionados para {aluno}!", "type": "success"}
+    def award(data):
+        if not aluno or aluno not in data.get(modalidade, {}):
+            raise Rollback({"message": "Selecione um aluno válido.", "type": "warning"})
+        data[modalidade][aluno] += total_pontos
+        return {"message": f"{total_pontos} pontos adicionados para {aluno}!", "type": "success"}
+    
+    return DATA_COMMITTER.submit(award)
 
 def delete_student_func(modalidade, aluno):
     """Delete a student"""
-    data = load_data()
-    
-    if aluno in data[modalidade]:
+    result = {"message": "Aluno não encontrado.", "type": "warning"}
+    with data_transaction() as data:
+        if aluno not in data.get(modalidade, {}):
+            raise Rollback
         del data[modalidade][aluno]
-        save_data(data)
-        return {"message": f"Aluno {aluno} removido com sucesso.", "type": "success"}
-    else:
-        return {"message": "Aluno não encontrado.", "type": "warning"}
+        roster_changed()
+        result = {"message": f"Aluno {aluno} removido com sucesso.", "type": "success"}
+    return result
 
 def get_modality_ranking(data, modalidade):
     """Get ranking for a specific modality"""
@@ -135,6 +176,51 @@ def get_general_ranking(data):
     return [{"pos": pos, "nome": nome, "pontos": pontos} 
             for pos, (nome, pontos) in enumerate(ranking, start=1)]
 
+def get_cached_ranking(modalidade):
+    """Get a modality (or "Geral") ranking plus name -> position and name -> points indexes, cached per data version"""
+    version = data_version()
+    cached = _ranking_cache.get(modalidade)
+    if cached and cached['version'] == version:
+        return cached
+    
+    data = get_cached_data()
+    if modalidade == "Geral":
+        ranking = get_general_ranking(data)
+    else:
+        ranking = get_modality_ranking(data, modalidade)
+    
+    cached = {'version': version,
+              'ranking': ranking,
+              'positions': {item['nome']: item['pos'] for item in ranking},
+              'points': {item['nome']: item['pontos'] for item in ranking}}
+    _ranking_cache[modalidade] = cached
+    return cached
+
+def get_students_list(data, modalidade):
+    """Get students of a modality with their points, in registration order"""
+    return [{"nome": nome, "pontos": pontos}
+            for nome, pontos in data.get(modalidade, {}).items()]
+
+def get_cached_students(modalidade):
+    """Get a modality's students list, cached per data version"""
+    version = data_version()
+    cached = _students_cache.get(modalidade)
+    if cached and cached[0] == version:
+        return cached[1]
+    
+    students = get_students_list(get_cached_data(), modalidade)
+    _students_cache[modalidade] = (version, students)
+    return students
+
+def paginate(items, offset=0, limit=PAGE_SIZE):
+    """Slice a list into a page envelope for the paginated endpoints"""
+    offset = max(offset, 0)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return {"items": items[offset:offset + limit],
+            "total": len(items),
+            "offset": offset,
+            "limit": limit}
+
 def export_ranking_html(modalidade):
     """Export ranking to HTML file"""
     data = load_data()
@@ -200,25 +286,41 @@ def export_ranking_html(modalidade):
     
     return filepath
 
-def bulk_delete_func(modalidade, alunos_list):
-    """Delete multiple students from a modality"""
+def bulk_delete_func(modalidade, alunos_list, excluded=None, expected_roster=None):
+    """Delete multiple students from a modality
+    
+    With excluded set, every student except those is deleted ("select all"), provided no
+    student was registered or deleted since expected_roster, the roster version the user saw.
+    """
     try:
-        data = load_data()
-        
-        if modalidade not in data:
-            return {'message': 'Modalidade inválida.', 'type': 'error'}
-        
         deleted_count = 0
         not_found = []
+        rejected = None
         
-        for aluno in alunos_list:
-            if aluno in data[modalidade]:
-                del data[modalidade][aluno]
-                deleted_count += 1
-            else:
-                not_found.append(aluno)
+        with data_transaction() as data:
+            if modalidade not in data:
+                rejected = {'message': 'Modalidade inválida.', 'type': 'error'}
+                raise Rollback
+            
+            if excluded is not None:
+                if expected_roster is None or roster_version() != expected_roster:
+                    rejected = {'message': 'A lista de alunos mudou desde que foi carregada. Revise a seleção e tente novamente.', 'type': 'warning'}
+                    raise Rollback
+                alunos_list = [aluno for aluno in data[modalidade] if aluno not in excluded]
+            
+            for aluno in alunos_list:
+                if aluno in data[modalidade]:
+                    del data[modalidade][aluno]
+                    deleted_count += 1
+                else:
+                    not_found.append(aluno)
+            
+            if not deleted_count:
+                raise Rollback
+            roster_changed()
         
-        save_data(data)
+        if rejected:
+            return rejected
         
         message_parts = []
         if deleted_count > 0: